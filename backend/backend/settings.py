@@ -177,6 +177,29 @@ else:
         },
     }
 
+# 缓存配置：default 始终使用进程内存缓存，其他缓存读写不依赖 Redis
+# 技术指标结果单独使用 indicators 缓存：有 Redis 时跨进程共享，否则同样使用进程内存
+if REDIS_URL:
+    INDICATOR_CACHE = {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": REDIS_URL,
+    }
+else:
+    INDICATOR_CACHE = {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "stock-indicators",
+    }
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "indicators": INDICATOR_CACHE,
+}
+
+# 技术指标计算结果缓存时长（秒），设为 0 关闭，便于排查数据陈旧问题
+STOCK_INDICATOR_CACHE_TIMEOUT = int(os.getenv('STOCK_INDICATOR_CACHE_TIMEOUT', 60 * 60))
+
 # Django REST Framework 配置
 REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
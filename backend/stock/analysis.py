@@ -52,7 +52,7 @@ def _extract_timestamps(hist_data: List[Dict]) -> List[Optional[str]]:
             # 3. 其他格式直接透传（如 ISO 格式）
             else:
                 timestamps.append(date_str)
-        except Exception:
+        except ValueError:
             timestamps.append(date_str)
             
     return timestamps
@@ -81,11 +81,11 @@ def calculate_technical_indicators(symbol: str, duration: str = '1 M', bar_size:
     if not hist_data or len(hist_data) == 0:
         return None, {"code": "NO_DATA", "message": f"无法获取历史数据: {symbol}"}
     
-    # 2. 准备基础数据数组
-    closes = np.array([bar['close'] for bar in hist_data])
-    highs = np.array([bar['high'] for bar in hist_data])
-    lows = np.array([bar['low'] for bar in hist_data])
-    volumes = np.array([bar['volume'] for bar in hist_data])
+    # 2. 准备基础数据数组 (单次遍历提取 OHLCV，按列拆分为连续数组)
+    closes, highs, lows, volumes = np.ascontiguousarray(np.array(
+        [(bar['close'], bar['high'], bar['low'], bar['volume']) for bar in hist_data],
+        dtype=np.float64
+    ).T)
     
     data_len = len(closes)
     if data_len < 20:
@@ -114,7 +114,6 @@ def calculate_technical_indicators(symbol: str, duration: str = '1 M', bar_size:
     result.update(calculate_fibonacci_retracement(highs, lows))
 
     # 5. 成交量相关指标
-    valid_volumes = volumes[volumes > 0]
     result.update(calculate_volume(volumes))
     
     if len(volumes) >= 20:
@@ -151,12 +150,10 @@ def calculate_technical_indicators(symbol: str, duration: str = '1 M', bar_size:
 
     # 7. 周期分析 (Yearly/Monthly/Cycles)
     if data_len >= 30:
-        timestamps = _extract_timestamps(hist_data)
-        
         # 基础周期波形分析
         cycle_data = calculate_cycle_analysis(
             closes, highs, lows,
-            volumes=volumes if len(valid_volumes) > 0 else None,
+            volumes=volumes if (volumes > 0).any() else None,
             timestamps=timestamps,
             use_adaptive=True,
             use_wavelet=True
@@ -8,6 +8,7 @@ import yfinance as yf
 from channels.generic.websocket import AsyncWebsocketConsumer
 from asgiref.sync import sync_to_async
 from .models import Stock
+from .yfinance import get_fast_quotes
 
 logger = logging.getLogger(__name__)
 
@@ -209,28 +210,21 @@ class StockConsumer(AsyncWebsocketConsumer):
                     await asyncio.sleep(5)
                     continue
 
-                # 批量获取数据
+                # 批量获取数据（fast_info 比 info 快），在线程池中执行，避免阻塞事件循环
                 symbols = list(self.subscribed_symbols)
-                for symbol in symbols:
-                    try:
-                        ticker = yf.Ticker(symbol)
-                        # 尝试获取 fast_info，因为它比 info 快
-                        info = ticker.fast_info
-                        price = info.get('last_price')
-                        
-                        if price:
-                            await self.send_json({
-                                'type': 'price_update',
-                                'data': {
-                                    'symbol': symbol,
-                                    'price': price,
-                                    'change': info.get('day_change'),
-                                    'change_pct': info.get('day_change_percent'),
-                                    'source': 'polling'
-                                }
-                            })
-                    except Exception as inner_e:
-                        logger.error(f"Polling error for {symbol}: {inner_e}")
+                quotes = await sync_to_async(get_fast_quotes, thread_sensitive=False)(symbols)
+                for symbol, quote in quotes.items():
+                    if quote and quote['price']:
+                        await self.send_json({
+                            'type': 'price_update',
+                            'data': {
+                                'symbol': symbol,
+                                'price': quote['price'],
+                                'change': quote['change'],
+                                'change_pct': quote['change_pct'],
+                                'source': 'polling'
+                            }
+                        })
                 
                 # 每 10 秒轮询一次，避免请求过频
                 await asyncio.sleep(10)
@@ -52,8 +52,7 @@ def fetch_news_api(query: str, days: int = 7) -> List[Dict[str, Any]]:
                 'content': art.get('content')
             })
         
-        # 打印 NewsAPI 获取结果
-        print(f"--- NewsAPI fetched {len(results)} articles for '{query}' ---")
+        logger.debug("NewsAPI 获取新闻 %d 条: %s", len(results), query)
         
         return results
     except Exception as e:
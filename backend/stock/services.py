@@ -1,15 +1,19 @@
 """
 服务层模块 - 处理股票分析业务逻辑
 """
+import hashlib
+import json
 import logging
 import math
 import re
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Any, Dict, Tuple, List
 
+from django.conf import settings
 from django.db import transaction
 from django.utils import timezone
-from django.core.cache import cache
+from django.core.cache import cache, caches
 
 from .analysis import calculate_technical_indicators
 from .models import Stock, StockProfile, StockQuote, StockKLine
@@ -26,18 +30,25 @@ from .yfinance import (
     get_holders,
     get_financials,
     search_symbols as yf_search_symbols,
+    FINANCIAL_STATEMENTS,
 )
 from .news_api import fetch_news_api
 
 logger = logging.getLogger(__name__)
 
+# 附加数据缓存时长（秒）：期权盘中变化较快，持股与财务按日更新
+OPTIONS_CACHE_TIMEOUT = 60 * 60
+HOLDERS_CACHE_TIMEOUT = 60 * 60 * 24
+FINANCIALS_CACHE_TIMEOUT = 60 * 60 * 24
 
-def _refresh_stock_data(symbol: str) -> Tuple[Stock | None, StockProfile | None, StockQuote | None]:
+
+def _refresh_stock_data(symbol: str, use_cache: bool = True) -> Tuple[Stock | None, StockProfile | None, StockQuote | None]:
     """
     [内部函数] 从 yfinance 获取最新数据，并同时更新 Stock, Profile, Quote
+    use_cache=False 时跳过 yfinance 层的 info/Ticker 缓存
     """
     try:
-        info = get_stock_info(symbol)
+        info = get_stock_info(symbol, use_cache=use_cache)
         if not info:
             return None, None, None
             
@@ -97,17 +108,18 @@ def _refresh_stock_data(symbol: str) -> Tuple[Stock | None, StockProfile | None,
         return None, None, None
 
 
-def get_or_update_stock_profile(symbol: str) -> Tuple[Stock, StockProfile | None]:
+def get_or_update_stock_profile(symbol: str, use_cache: bool = True) -> Tuple[Stock, StockProfile | None]:
     """
     获取或更新股票基本面数据
+    use_cache=False 时无论是否过期都强制从 yfinance 刷新
     """
     try:
         stock, _ = Stock.objects.get_or_create(symbol=symbol)
         profile = getattr(stock, 'profile', None)
             
-        # 如果不存在或已过期，则调用统一刷新
-        if not profile or profile.is_stale(hours=24):
-            _stock, _profile, _ = _refresh_stock_data(symbol)
+        # 如果不存在、已过期或要求强制刷新，则调用统一刷新
+        if not use_cache or not profile or profile.is_stale(hours=24):
+            _stock, _profile, _ = _refresh_stock_data(symbol, use_cache=use_cache)
             if _stock:
                 stock, profile = _stock, _profile
                 
@@ -235,12 +247,12 @@ def _fetch_klines_from_db(stock: Stock, period: str, duration: str) -> List[Dict
     return result
 
 
-def get_cached_news(symbol: str) -> List[Dict[str, Any]]:
+def get_cached_news(symbol: str, use_cache: bool = True) -> List[Dict[str, Any]]:
     """
     获取新闻数据（带缓存）
     """
     key = f"stock_news_{symbol}"
-    news = cache.get(key)
+    news = cache.get(key) if use_cache else None
     if not news:
         try:
             # 1. 从 yfinance 获取
@@ -257,15 +269,16 @@ def get_cached_news(symbol: str) -> List[Dict[str, Any]]:
             
             if news:
                 cache.set(key, news, timeout=60*15) # 15分钟缓存
-            
-            # 打印获取到的新闻
-            print(f"\n{'='*20} Fetched News for {symbol} {'='*20}")
-            if news:
-                for i, n in enumerate(news, 1):
-                    print(f"{i}. [{n.get('provider_publish_time_fmt')}] {n.get('title')} ({n.get('publisher')})")
-            else:
-                print("No news found.")
-            print(f"{'='*50}\n")
+
+            # 新闻明细只在开启 DEBUG 日志时格式化
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    "获取新闻 %d 条: %s\n%s", len(news), symbol,
+                    "\n".join(
+                        f"{i}. [{n.get('provider_publish_time_fmt')}] {n.get('title')} ({n.get('publisher')})"
+                        for i, n in enumerate(news, 1)
+                    ),
+                )
         except Exception as e:
             logger.warning(f"获取新闻失败: {symbol}, {e}")
             news = []
@@ -414,7 +427,82 @@ def _sync_stock_klines(stock: Stock, bar_size: str, duration: str, profile: Stoc
         return False, err_msg
 
 
-def perform_analysis(symbol: str, duration: str, bar_size: str, use_cache: bool = True) -> Tuple[Dict[str, Any] | None, Tuple[Dict[str, Any], int] | None]:
+def _get_or_fetch_cached(key: str, fetcher, symbol: str, timeout: int, use_cache: bool = True) -> Any:
+    """
+    [内部函数] 优先读取缓存，未命中(或不使用缓存)时调用 fetcher 获取并写入缓存
+    fetcher 返回 None 表示获取失败，不写入缓存，下次请求重新获取
+    """
+    data = cache.get(key) if use_cache else None
+    if data is None:
+        data = fetcher(symbol)
+        if data is not None:
+            cache.set(key, data, timeout=timeout)
+    return data
+
+
+def _get_cached_indicators(symbol: str, duration: str, bar_size: str, candles: List[Dict[str, Any]], use_cache: bool) -> Dict[str, Any]:
+    """
+    [内部函数] 计算技术指标，结果以 (symbol, K线内容哈希) 为键缓存在 indicators 缓存中
+    相同的 K线快照直接复用上次的计算结果；缓存不可用（如 Redis 故障）时直接计算
+    """
+    timeout = settings.STOCK_INDICATOR_CACHE_TIMEOUT
+    key = None
+    if timeout > 0:
+        digest = hashlib.sha1(json.dumps(candles, separators=(',', ':')).encode()).hexdigest()
+        key = f"stock_indicators_{symbol}_{digest}"
+        if use_cache:
+            try:
+                cached = caches['indicators'].get(key)
+            except Exception as e:
+                logger.warning(f"读取指标缓存失败: {symbol}, {e}")
+                cached = None
+            if cached is not None:
+                return cached
+
+    indicators, ind_error = calculate_technical_indicators(symbol, duration, bar_size, hist_data=candles)
+    if ind_error:
+        logger.warning(f"指标计算异常: {symbol}, {ind_error}")
+        return indicators or {}
+
+    if key:
+        try:
+            caches['indicators'].set(key, indicators, timeout=timeout)
+        except Exception as e:
+            logger.warning(f"写入指标缓存失败: {symbol}, {e}")
+    return indicators
+
+
+def get_cached_financials(symbol: str, use_cache: bool = True) -> Dict[str, Any] | None:
+    """
+    获取财务报表（每张报表单独缓存）
+    只请求未命中缓存的报表；获取失败的报表不写入缓存、下次请求重试，已获取的报表照常返回
+    """
+    keys = {name: f"stock_financials_{symbol}_{name}" for name in FINANCIAL_STATEMENTS}
+    cached = cache.get_many(list(keys.values())) if use_cache else {}
+    financials = {name: cached[key] for name, key in keys.items() if key in cached}
+
+    missing = tuple(name for name in FINANCIAL_STATEMENTS if name not in financials)
+    if missing:
+        fetched = get_financials(symbol, missing) or {}
+        cache.set_many({keys[name]: statement for name, statement in fetched.items()}, timeout=FINANCIALS_CACHE_TIMEOUT)
+        financials.update(fetched)
+
+    if not financials:
+        return None
+    return {name: financials.get(name, {}) for name in FINANCIAL_STATEMENTS}
+
+
+# 分析结果中的附加数据：(字段名, 缓存键前缀, 获取函数, 缓存时长, 获取失败时的缺省值工厂)
+# 缓存键前缀为 None 表示获取函数自带缓存（以 fetcher(symbol, use_cache) 调用）
+SUPPLEMENTARY_FETCHERS = (
+    ('news_data', None, get_cached_news, None, list),
+    ('options_summary', 'stock_options', get_options_chain, OPTIONS_CACHE_TIMEOUT, dict),
+    ('holders_data', 'stock_holders', get_holders, HOLDERS_CACHE_TIMEOUT, dict),
+    ('financials', None, get_cached_financials, None, dict),
+)
+
+
+def perform_analysis(symbol: str, duration: str, bar_size: str, use_cache: bool = True, include_indicators: bool = True) -> Tuple[Dict[str, Any] | None, Tuple[Dict[str, Any], int] | None]:
     """
     执行技术分析：实时计算，基于 StockKLine 和 StockProfile
     
@@ -423,20 +511,15 @@ def perform_analysis(symbol: str, duration: str, bar_size: str, use_cache: bool
         duration: 数据周期
         bar_size: K线周期
         use_cache: 是否使用缓存 (默认 True)
+        include_indicators: 是否计算指标并获取附加数据 (默认 True，调用方不需要时跳过)
         
     Returns:
         (分析结果字典, 错误响应元组) 或 (None, 错误响应元组)
     """
-    # 1. 确保基础信息和实时行情是最新的
-    stock, profile = get_or_update_stock_profile(symbol)
+    # 1. 确保基础信息和实时行情是最新的 (不使用缓存时强制刷新，并重建 Ticker 供后续附加数据使用)
+    stock, profile = get_or_update_stock_profile(symbol, use_cache=use_cache)
     if not stock:
         return None, ({"success": False, "message": f"股票不存在: {symbol}"}, 404)
-        
-    # 如果不使用缓存且 profile 已存在，强制更新一次
-    if not use_cache and profile:
-        _stock, _profile, _ = _refresh_stock_data(symbol)
-        if _stock:
-            stock, profile = _stock, _profile
 
     # 2. 同步 K线数据
     success, sync_error = _sync_stock_klines(stock, bar_size, duration, profile)
@@ -450,33 +533,37 @@ def perform_analysis(symbol: str, duration: str, bar_size: str, use_cache: bool
     if not candles:
         return None, ({"success": False, "message": f"无历史 K线数据: {symbol}"}, 404)
     
-    # 4. 计算指标
-    indicators, ind_error = calculate_technical_indicators(symbol, duration, bar_size, hist_data=candles)
-    if ind_error:
-        logger.warning(f"指标计算异常: {symbol}, {ind_error}")
-        indicators = indicators or {}
+    if not include_indicators:
+        indicators = {}
+    else:
+        # 4. 计算指标 (指标只取决于 K线内容，按内容哈希缓存)
+        indicators = _get_cached_indicators(symbol, duration, bar_size, candles, use_cache)
 
-    # 5. 补充附加数据 (基本面、新闻、期权、持股)
-    if profile and profile.raw_info:
-        indicators['fundamental_data'] = profile.raw_info
+        # 5. 补充附加数据 (基本面、新闻、期权、持股)
+        if profile and profile.raw_info:
+            indicators['fundamental_data'] = profile.raw_info
     
-    indicators['news_data'] = get_cached_news(symbol)
-    
-    # 获取期权、持股和财务信息 (带缓存控制)
-    indicators['options_summary'] = cache.get(f"stock_options_{symbol}") if use_cache else None
-    if indicators['options_summary'] is None:
-        indicators['options_summary'] = get_options_chain(symbol)
-        cache.set(f"stock_options_{symbol}", indicators['options_summary'], timeout=60*60) # 1小时缓存
-        
-    indicators['holders_data'] = cache.get(f"stock_holders_{symbol}") if use_cache else None
-    if indicators['holders_data'] is None:
-        indicators['holders_data'] = get_holders(symbol)
-        cache.set(f"stock_holders_{symbol}", indicators['holders_data'], timeout=60*60*24) # 24小时缓存
+        # 新闻、期权、持股和财务信息互相独立，各自是网络请求，并发获取 (带缓存控制)
+        calls = []
+        for field, prefix, fetcher, timeout, default in SUPPLEMENTARY_FETCHERS:
+            if prefix is None:
+                calls.append((field, default, fetcher, (symbol, use_cache)))
+            else:
+                calls.append((field, default, _get_or_fetch_cached, (f"{prefix}_{symbol}", fetcher, symbol, timeout, use_cache)))
 
-    indicators['financials'] = cache.get(f"stock_financials_{symbol}") if use_cache else None
-    if indicators['financials'] is None:
-        indicators['financials'] = get_financials(symbol)
-        cache.set(f"stock_financials_{symbol}", indicators['financials'], timeout=60*60*24) # 24小时缓存
+        with ThreadPoolExecutor(max_workers=len(calls)) as executor:
+            futures = []
+            for field, default, func, args in calls:
+                futures.append((field, default, executor.submit(func, *args)))
+
+        # 单项失败只影响该字段，不影响指标和其他附加数据
+        for field, default, future in futures:
+            try:
+                value = future.result()
+            except Exception as e:
+                logger.warning(f"获取附加数据失败: {symbol}, {field}, {e}")
+                value = None
+            indicators[field] = value if value is not None else default()
 
     # 6. 构建并返回结果
     currency_code = profile.raw_info.get("currency") if profile and profile.raw_info else "USD"
@@ -492,9 +579,9 @@ def perform_analysis(symbol: str, duration: str, bar_size: str, use_cache: bool
 
 def fetch_options(symbol: str) -> Dict[str, Any] | None:
     """
-    获取期权数据
+    获取期权数据（与分析接口共用缓存）
     """
-    return get_options_chain(symbol)
+    return _get_or_fetch_cached(f"stock_options_{symbol}", get_options_chain, symbol, OPTIONS_CACHE_TIMEOUT)
 
 
 def search_stocks(query: str) -> List[Dict[str, Any]]:
@@ -536,8 +623,13 @@ def search_stocks(query: str) -> List[Dict[str, Any]]:
     except Exception as e:
         logger.debug(f"本地搜索失败: {e}")
 
-    # 2. 调用 yfinance 搜索补充
-    yf_results = yf_search_symbols(query)
+    # 2. 调用 yfinance 搜索补充 (搜索结果短时缓存，重复输入不再请求 Yahoo)
+    search_key = f"stock_search_{hashlib.md5(query.strip().lower().encode()).hexdigest()}"
+    yf_results = cache.get(search_key)
+    if yf_results is None:
+        yf_results = yf_search_symbols(query)
+        if yf_results:
+            cache.set(search_key, yf_results, timeout=60*60)  # 1小时缓存
     
     # 合并结果
     seen = {r['symbol'] for r in results}
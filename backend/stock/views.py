@@ -76,31 +76,35 @@ class StockAnalysisViewSet(viewsets.ViewSet):
         duration = request.query_params.get("duration", "5y")
         bar_size = request.query_params.get("bar_size", "1 day")
 
-        result, error = perform_analysis(symbol, duration, bar_size, use_cache=True)
+        # 处理 modules 参数过滤
+        modules = request.query_params.get('modules', '').lower()
+        module_list = modules.split(',') if modules else []
+
+        # 如果不包含 chart, cycle, technical, news, options，不需要 indicators
+        # 注意: indicators 中包含了新闻、期权和技术指标数据，不需要时直接跳过计算和获取
+        needed_indicators = {
+            'chart', 'k线', '图表', 
+            'cycle', '周期', 
+            'technical', '技术', '技术分析', 'indicators', '指标',
+            'news', '新闻',
+            'options', '期权'
+        }
+        include_indicators = not module_list or any(m in needed_indicators for m in module_list)
+
+        result, error = perform_analysis(
+            symbol, duration, bar_size, use_cache=True, include_indicators=include_indicators
+        )
         if error:
             return Response(clean_nan_values(error[0]), status=error[1])
         
         data = result
         
-        # 处理 modules 参数过滤
-        modules = request.query_params.get('modules', '').lower()
-        if modules:
-            module_list = modules.split(',')
-            
+        if module_list:
             # 如果不包含 chart，移除 candles
             if 'chart' not in module_list and 'k线' not in module_list and '图表' not in module_list:
                 data.pop('candles', None)
                 
-            # 如果不包含 chart, cycle, technical, news, options，移除 indicators
-            # 注意: indicators 中包含了新闻、期权和技术指标数据
-            needed_indicators = {
-                'chart', 'k线', '图表', 
-                'cycle', '周期', 
-                'technical', '技术', '技术分析', 'indicators', '指标',
-                'news', '新闻',
-                'options', '期权'
-            }
-            if not any(m in needed_indicators for m in module_list):
+            if not include_indicators:
                 data.pop('indicators', None)
 
         return Response(data)
@@ -7,10 +7,14 @@ YFinance数据获取模块 - 从yfinance获取股票数据
 """
 
 import os
+import random
+import time
 import logging
+from functools import lru_cache
 from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional, Tuple
 from django.db import models
+from django.core.cache import cache
 
 # 在 Python 3.14 下强制使用 protobuf 纯 Python 实现，避免 upb 编译问题
 # 必须在导入任何可能使用 protobuf 的模块之前设置
@@ -27,15 +31,177 @@ import numpy as np
 import pandas as pd
 import pytz
 import requests
+from requests.adapters import HTTPAdapter
 import xml.etree.ElementTree as ET
 import threading
 import queue
+from concurrent.futures import Future, ThreadPoolExecutor
+from dateutil import parser as date_parser
 
 # 直接导入 yfinance，如果失败会在导入时抛出异常
 import yfinance as yf
 
 logger = logging.getLogger(__name__)
 
+
+class YFRateLimiter:
+    """
+    令牌桶限流器：按固定速率补充令牌，令牌耗尽时阻塞等待
+    所有发往 Yahoo Finance 的请求先取令牌，以可持续速率排队而不是触发 429 后失败
+    """
+
+    def __init__(self, rate: float = 2.0, max_tokens: float = 10.0):
+        self.rate = rate
+        self.max_tokens = max_tokens
+        self.tokens = max_tokens
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """
+        获取一个令牌，必要时阻塞直到令牌补充
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.max_tokens, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+# 进程级共享的 Yahoo 请求限流器
+_yf_limiter = YFRateLimiter(
+    rate=float(os.getenv('YF_RATE_LIMIT', '2')),
+    max_tokens=float(os.getenv('YF_RATE_BURST', '10')),
+)
+
+# yf.Ticker 实例复用时长（秒）：同一代码的多个访问共享会话与 yfinance 内部缓存，
+# 过期后重建，避免长期持有的实例返回陈旧的 info/新闻等属性
+TICKER_CACHE_TIMEOUT = 60 * 5
+TICKER_CACHE_MAXSIZE = 512
+
+# 触发 Yahoo 限流 (YFRateLimitError) 时的重试次数与指数退避参数（秒）
+YF_MAX_RETRIES = int(os.getenv('YF_MAX_RETRIES', '3'))
+YF_RETRY_BASE_DELAY = 0.5
+YF_RETRY_MAX_DELAY = 8.0
+
+# 直接请求 Yahoo 接口（如代码搜索）时共享的 HTTP 会话，复用连接与 TLS 握手
+# yf.Ticker 由 yfinance 自行管理会话（需要 curl_cffi），不使用该会话
+_http_session = requests.Session()
+_http_session.mount('https://', HTTPAdapter(pool_connections=8, pool_maxsize=32))
+_http_session.headers.update({
+    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': '*/*',
+    'Accept-Encoding': 'gzip, deflate',
+})
+
+# 同时进行中的 Yahoo 请求上限（进程级），限制并发扇出，避免瞬时请求过多触发 429
+_yf_semaphore = threading.BoundedSemaphore(int(os.getenv('YF_MAX_CONCURRENCY', '8')))
+
+# ticker.info 缓存时长（秒），info 在盘中会变化，保持较短
+INFO_CACHE_TIMEOUT = 60 * 5
+# ticker.info 回源单飞锁的超时（秒），也是并发请求等待结果的最长时间
+INFO_LOCK_TIMEOUT = 10
+# fast_info 轻量行情缓存时长（秒），与轮询间隔一致，所有轮询连接共享同一份行情
+FAST_QUOTE_CACHE_TIMEOUT = 10
+
+# bar_size -> yfinance interval
+INTERVAL_MAP = {
+    '1 min': '1m',
+    '2 mins': '2m',
+    '5 mins': '5m',
+    '15 mins': '15m',
+    '30 mins': '30m',
+    '1 hour': '1h',
+    '1 day': '1d',
+    '1 week': '1wk',
+    '1 month': '1mo'
+}
+
+# 格式化后的历史数据缓存时长（秒）：分钟线需要及时更新，日线及以上可以缓存更久
+HISTORY_CACHE_TIMEOUT_INTRADAY = 30
+HISTORY_CACHE_TIMEOUT_DAILY = 60 * 60
+DAILY_INTERVALS = frozenset({'1d', '1wk', '1mo'})
+
+# get_financials 获取的财务报表
+FINANCIAL_STATEMENTS = ('income_stmt', 'balance_sheet', 'cashflow')
+
+# get_fundamental_data 输出字段 -> (info 字段, 缺省值)
+FUNDAMENTAL_FIELDS = {
+    'ShortName': ('shortName', ''),
+    'Exchange': ('exchange', ''),
+    'Sector': ('sector', ''),
+    'Industry': ('industry', ''),
+    'Website': ('website', ''),
+    'Employees': ('fullTimeEmployees', 0),
+    'BusinessSummary': ('longBusinessSummary', ''),
+
+    'MarketCap': ('marketCap', 0),
+    'EnterpriseValue': ('enterpriseValue', 0),
+    'PreviousClose': ('previousClose', 0),
+    '52WeekHigh': ('fiftyTwoWeekHigh', 0),
+    '52WeekLow': ('fiftyTwoWeekLow', 0),
+
+    'PE': ('trailingPE', 0),
+    'ForwardPE': ('forwardPE', 0),
+    'PriceToBook': ('priceToBook', 0),
+    'PriceToSales': ('priceToSalesTrailing12Months', 0),
+    'PEGRatio': ('pegRatio', 0),
+    'EVToRevenue': ('enterpriseToRevenue', 0),
+    'EVToEBITDA': ('enterpriseToEbitda', 0),
+
+    'ProfitMargin': ('profitMargins', 0),
+    'OperatingMargin': ('operatingMargins', 0),
+    'GrossMargin': ('grossMargins', 0),
+    'ROE': ('returnOnEquity', 0),
+    'ROA': ('returnOnAssets', 0),
+    'ROIC': ('returnOnInvestedCapital', 0),
+
+    'RevenueTTM': ('totalRevenue', 0),
+    'RevenuePerShare': ('revenuePerShare', 0),
+    'NetIncomeTTM': ('netIncomeToCommon', 0),
+    'EBITDATTM': ('ebitda', 0),
+    'TotalDebt': ('totalDebt', 0),
+    'DebtToEquity': ('debtToEquity', 0),
+    'CurrentRatio': ('currentRatio', 0),
+    'QuickRatio': ('quickRatio', 0),
+    'CashFlow': ('operatingCashflow', 0),
+
+    'EPS': ('trailingEps', 0),
+    'ForwardEPS': ('forwardEps', 0),
+    'BookValuePerShare': ('bookValue', 0),
+
+    'RevenueGrowth': ('revenueGrowth', 0),
+    'EarningsGrowth': ('earningsGrowth', 0),
+    'EarningsQuarterlyGrowth': ('earningsQuarterlyGrowth', 0),
+    'QuarterlyRevenueGrowth': ('quarterlyRevenueGrowth', 0),
+
+    'Beta': ('beta', 0),
+    'AverageVolume': ('averageVolume', 0),
+    'AverageVolume10days': ('averageVolume10days', 0),
+    'FloatShares': ('floatShares', 0),
+}
+
+# 新闻字段 -> 候选路径（按优先级，点号表示嵌套），兼容 yfinance 新旧两种新闻格式
+# 导入时预先拆分为键元组，逐条新闻只做字典查找
+NEWS_FIELD_PATHS = {
+    field: tuple(tuple(path.split('.')) for path in paths)
+    for field, paths in {
+        'uuid': ('id', 'uuid'),
+        'title': ('content.title', 'title'),
+        'publisher': ('content.provider.displayName', 'publisher'),
+        'link': ('content.clickThroughUrl.url', 'content.canonicalUrl.url', 'link'),
+        'pub_time': ('content.pubDate', 'providerPublishTime'),
+        'type': ('content.contentType', 'type'),
+        'summary': ('content.summary', 'content.description', 'summary', 'description'),
+        'thumbnail': ('content.thumbnail', 'thumbnail'),
+    }.items()
+}
+
 CURR_SYMBOL_MAP = {
     "USD": "$",
     "CNY": "¥",
@@ -73,6 +239,140 @@ def sanitize_data(data: Any) -> Any:
     return data
 
 
+def _yf_call(func, *args, **kwargs):
+    """
+    经限流器和并发上限调用 yfinance，遇到 Yahoo 限流时按指数退避（带随机抖动）重试
+    其他异常直接抛出，由调用方处理
+    """
+    for attempt in range(YF_MAX_RETRIES + 1):
+        _yf_limiter.acquire()
+        try:
+            with _yf_semaphore:
+                return func(*args, **kwargs)
+        except yf.exceptions.YFRateLimitError:
+            if attempt == YF_MAX_RETRIES:
+                raise
+            delay = min(YF_RETRY_MAX_DELAY, YF_RETRY_BASE_DELAY * 2 ** attempt)
+            delay *= random.uniform(0.5, 1.0)
+            logger.warning(f"Yahoo 限流，{delay:.2f}s 后重试 ({attempt + 1}/{YF_MAX_RETRIES})")
+            time.sleep(delay)
+
+
+_inflight: Dict[str, Future] = {}
+_inflight_lock = threading.Lock()
+
+
+def _coalesced(key: str, func, *args, **kwargs):
+    """
+    合并进程内对同一 key 的并发请求：只有第一个调用方真正执行 func，
+    其余调用方等待并共享同一结果（或同一异常）
+    """
+    with _inflight_lock:
+        future = _inflight.get(key)
+        owner = future is None
+        if owner:
+            future = Future()
+            _inflight[key] = future
+
+    if not owner:
+        return future.result()
+
+    try:
+        result = func(*args, **kwargs)
+        future.set_result(result)
+        return result
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+
+
+_tickers: Dict[str, Tuple[yf.Ticker, float]] = {}
+_tickers_lock = threading.Lock()
+
+
+def _get_ticker(symbol: str, refresh: bool = False) -> yf.Ticker:
+    """
+    获取 yf.Ticker 实例，按股票代码在进程内短时复用
+    refresh=True 时丢弃已缓存的实例（其内部缓存了 info、新闻、期权等属性）并重建，
+    之后同一代码的其他访问也使用新实例
+    """
+    now = time.monotonic()
+    with _tickers_lock:
+        entry = _tickers.get(symbol)
+        if not refresh and entry is not None and now - entry[1] < TICKER_CACHE_TIMEOUT:
+            return entry[0]
+        if len(_tickers) >= TICKER_CACHE_MAXSIZE:
+            # 先清理过期实例，仍然超限时淘汰最早创建的
+            for key in [k for k, (_, created) in _tickers.items() if now - created >= TICKER_CACHE_TIMEOUT]:
+                del _tickers[key]
+            if len(_tickers) >= TICKER_CACHE_MAXSIZE:
+                del _tickers[next(iter(_tickers))]
+        ticker = yf.Ticker(symbol)
+        _tickers.pop(symbol, None)
+        _tickers[symbol] = (ticker, now)
+        return ticker
+
+
+def _dig(data: Any, keys: Tuple[str, ...]) -> Any:
+    """
+    沿键路径逐层读取嵌套字典，任一层缺失或不是字典时返回 None
+    """
+    for key in keys:
+        if not isinstance(data, dict):
+            return None
+        data = data.get(key)
+    return data
+
+
+def _first_path(data: dict, paths: Tuple[Tuple[str, ...], ...]) -> Any:
+    """
+    按顺序返回第一个非空路径的值，全部为空时返回 None
+    """
+    return next((value for path in paths if (value := _dig(data, path))), None)
+
+
+def _get_ticker_info(symbol: str, ticker: yf.Ticker, use_cache: bool = True) -> dict:
+    """
+    获取 ticker.info，按股票代码缓存，缓存有效期内不再请求 Yahoo
+    缓存未命中时用 cache.add 做单飞锁：同一代码只有一个请求回源，
+    其余并发请求退避轮询缓存，等待结果写入后直接读取
+    use_cache=False 时先删除已缓存的 info，强制回源
+    """
+    key = f"yf_info_{symbol}"
+    if not use_cache:
+        cache.delete(key)
+    info = cache.get(key)
+    if info is not None:
+        return info
+
+    lock_key = f"{key}_lock"
+    owns_lock = cache.add(lock_key, 1, timeout=INFO_LOCK_TIMEOUT)
+    if not owns_lock:
+        delay = 0.05
+        deadline = time.monotonic() + INFO_LOCK_TIMEOUT
+        while time.monotonic() < deadline:
+            time.sleep(delay)
+            info = cache.get(key)
+            if info is not None:
+                return info
+            # 持锁请求已结束但没有写入缓存（获取失败），自行回源
+            if cache.get(lock_key) is None:
+                break
+            delay = min(delay * 2, 1.0)
+
+    try:
+        info = _yf_call(lambda: ticker.info)
+        if info:
+            cache.set(key, info, timeout=INFO_CACHE_TIMEOUT)
+        return info
+    finally:
+        if owns_lock:
+            cache.delete(lock_key)
+
+
 def _resolve_currency_code(info: dict | None, ticker: yf.Ticker) -> str:
     """
     根据yfinance返回的信息推断货币代码，优先info，其次fast_info。
@@ -81,12 +381,8 @@ def _resolve_currency_code(info: dict | None, ticker: yf.Ticker) -> str:
         return info["currency"]
 
     try:
-        fast_info = ticker.fast_info
-        if hasattr(fast_info, "get"):
-            code = fast_info.get("currency")
-            if code:
-                return str(code)
-        code = getattr(fast_info, "currency", None)
+        # FastInfo 支持按键读取，只解析所需的 currency 字段
+        code = _yf_call(ticker.fast_info.get, "currency")
         if code:
             return str(code)
     except Exception:
@@ -104,13 +400,14 @@ def _resolve_currency_symbol(currency_code: str) -> str:
     return CURR_SYMBOL_MAP.get(currency_code.upper(), currency_code.upper())
 
 
-def get_stock_info(symbol: str):
+def get_stock_info(symbol: str, use_cache: bool = True):
     """
     获取股票详细信息
+    use_cache=False 时重建 Ticker 并跳过 info 缓存，获取最新数据
     """
     try:
-        ticker = yf.Ticker(symbol)
-        info = ticker.info
+        ticker = _get_ticker(symbol, refresh=not use_cache)
+        info = _get_ticker_info(symbol, ticker, use_cache=use_cache)
         
         if not info:
             return None
@@ -130,7 +427,7 @@ def get_stock_info(symbol: str):
         # 如果 live 价格和 info 价格都拿不到，尝试 fast_info
         if not current_price or current_price == 0.0:
             try:
-                fast_price = ticker.fast_info.get('last_price')
+                fast_price = _yf_call(ticker.fast_info.get, 'last_price')
                 if fast_price:
                     current_price = fast_price
             except Exception:
@@ -235,6 +532,48 @@ def get_live_price(symbol: str, timeout: float = 2.0) -> float | None:
                 pass
 
 
+def _read_fast_quote(ticker: yf.Ticker) -> Dict[str, Any]:
+    """读取 fast_info 中的最新价与日涨跌（访问时才会真正请求 Yahoo）"""
+    fast_info = ticker.fast_info
+    return {
+        'price': fast_info.get('last_price'),
+        'change': fast_info.get('day_change'),
+        'change_pct': fast_info.get('day_change_percent'),
+    }
+
+
+def _fetch_fast_quote(symbol: str, cache_key: str) -> Dict[str, Any] | None:
+    try:
+        # 使用临时 Ticker：FastInfo 会记住已读取的价格，且不替换 _get_ticker 共享的实例
+        quote = _yf_call(_read_fast_quote, yf.Ticker(symbol))
+    except Exception as e:
+        logger.error(f"获取实时行情失败: {symbol}, 错误: {e}")
+        return None
+    cache.set(cache_key, quote, FAST_QUOTE_CACHE_TIMEOUT)
+    return quote
+
+
+def _get_fast_quote(symbol: str) -> Dict[str, Any] | None:
+    cache_key = f"yf_fast_quote_{symbol}"
+    quote = cache.get(cache_key)
+    if quote is None:
+        quote = _coalesced(cache_key, _fetch_fast_quote, symbol, cache_key)
+    return quote
+
+
+def get_fast_quotes(symbols: List[str], max_workers: int = 8) -> Dict[str, Dict[str, Any] | None]:
+    """
+    批量获取轻量行情（fast_info），用于 WebSocket 不可用时的轮询
+    行情按代码短时缓存并合并并发请求，多个轮询连接订阅同一代码时只回源一次；
+    未命中的代码在线程池中并发请求，仍受限流器和并发上限约束；单个代码失败时对应值为 None
+    """
+    symbols = list(dict.fromkeys(symbols))
+    if not symbols:
+        return {}
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(symbols))) as executor:
+        return dict(zip(symbols, executor.map(_get_fast_quote, symbols)))
+
+
 def search_symbols(query: str) -> List[Dict[str, Any]]:
     """
     通过查询关键词搜索股票代码 (仅从 Yahoo Finance 获取)
@@ -249,15 +588,13 @@ def search_symbols(query: str) -> List[Dict[str, Any]]:
     
     # 尝试从 Yahoo Finance 获取
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept': '*/*',
-        }
         # 使用 quote 对中文进行编码
         from urllib.parse import quote
         url = f"https://query2.finance.yahoo.com/v1/finance/search?q={quote(query)}&quotesCount=10&newsCount=0"
         
-        response = requests.get(url, headers=headers, timeout=5)
+        _yf_limiter.acquire()
+        with _yf_semaphore:
+            response = _http_session.get(url, timeout=5)
         if response.status_code == 200:
             data = response.json()
             quotes = data.get('quotes', [])
@@ -278,7 +615,7 @@ def search_symbols(query: str) -> List[Dict[str, Any]]:
 
         # 回退到 yf.Search (虽然它可能也会被 rate limit)
         if not results:
-            search = yf.Search(query, max_results=10)
+            search = _yf_call(yf.Search, query, max_results=10)
             if search.quotes:
                 for quote_item in search.quotes:
                     results.append({
@@ -305,10 +642,10 @@ def get_fundamental_data(symbol: str):
     返回公司财务数据、估值指标、财务报表、资产负债表、现金流量表等
     """
     try:
-        ticker = yf.Ticker(symbol)
+        ticker = _get_ticker(symbol)
         
         try:
-            info = ticker.info
+            info = _get_ticker_info(symbol, ticker)
         except Exception as e:
             logger.debug(f"无法获取股票信息: {symbol}, 错误: {e}")
             return None
@@ -325,65 +662,14 @@ def get_fundamental_data(symbol: str):
         
         fundamental = {
             'CompanyName': info.get('longName', info.get('shortName', symbol)),
-            'ShortName': info.get('shortName', ''),
-            'Exchange': info.get('exchange', ''),
             'Currency': currency_code,
             'CurrencySymbol': currency_symbol,
-            'Sector': info.get('sector', ''),
-            'Industry': info.get('industry', ''),
-            'Website': info.get('website', ''),
-            'Employees': info.get('fullTimeEmployees', 0),
-            'BusinessSummary': info.get('longBusinessSummary', ''),
-            
-            'MarketCap': info.get('marketCap', 0),
-            'EnterpriseValue': info.get('enterpriseValue', 0),
             'Price': info.get('currentPrice', info.get('regularMarketPrice', 0)),
-            'PreviousClose': info.get('previousClose', 0),
-            '52WeekHigh': info.get('fiftyTwoWeekHigh', 0),
-            '52WeekLow': info.get('fiftyTwoWeekLow', 0),
             'SharesOutstanding': shares_outstanding,
-            
-            'PE': info.get('trailingPE', 0),
-            'ForwardPE': info.get('forwardPE', 0),
-            'PriceToBook': info.get('priceToBook', 0),
-            'PriceToSales': info.get('priceToSalesTrailing12Months', 0),
-            'PEGRatio': info.get('pegRatio', 0),
-            'EVToRevenue': info.get('enterpriseToRevenue', 0),
-            'EVToEBITDA': info.get('enterpriseToEbitda', 0),
-            
-            'ProfitMargin': info.get('profitMargins', 0),
-            'OperatingMargin': info.get('operatingMargins', 0),
-            'GrossMargin': info.get('grossMargins', 0),
-            'ROE': info.get('returnOnEquity', 0),
-            'ROA': info.get('returnOnAssets', 0),
-            'ROIC': info.get('returnOnInvestedCapital', 0),
-            
-            'RevenueTTM': info.get('totalRevenue', 0),
-            'RevenuePerShare': info.get('revenuePerShare', 0),
-            'NetIncomeTTM': info.get('netIncomeToCommon', 0),
-            'EBITDATTM': info.get('ebitda', 0),
-            'TotalDebt': info.get('totalDebt', 0),
             'TotalCash': total_cash,
             'CashPerShare': cash_per_share,
-            'DebtToEquity': info.get('debtToEquity', 0),
-            'CurrentRatio': info.get('currentRatio', 0),
-            'QuickRatio': info.get('quickRatio', 0),
-            'CashFlow': info.get('operatingCashflow', 0),
-            
-            'EPS': info.get('trailingEps', 0),
-            'ForwardEPS': info.get('forwardEps', 0),
-            'BookValuePerShare': info.get('bookValue', 0),
-            
-            'RevenueGrowth': info.get('revenueGrowth', 0),
-            'EarningsGrowth': info.get('earningsGrowth', 0),
-            'EarningsQuarterlyGrowth': info.get('earningsQuarterlyGrowth', 0),
-            'QuarterlyRevenueGrowth': info.get('quarterlyRevenueGrowth', 0),
-            
-            'Beta': info.get('beta', 0),
-            'AverageVolume': info.get('averageVolume', 0),
-            'AverageVolume10days': info.get('averageVolume10days', 0),
-            'FloatShares': info.get('floatShares', 0),
         }
+        fundamental.update({out: info.get(src, default) for out, (src, default) in FUNDAMENTAL_FIELDS.items()})
         
         return sanitize_data(fundamental)
         
@@ -394,6 +680,7 @@ def get_fundamental_data(symbol: str):
 
 
 
+@lru_cache(maxsize=32)
 def _calculate_period_from_duration(duration: str) -> str:
     """
     根据duration参数计算yfinance的period参数
@@ -428,134 +715,152 @@ def _calculate_period_from_duration(duration: str) -> str:
             return f"{int(years)}y"
         else:
             return "2y"
-    except Exception as e:
+    except (ValueError, AttributeError) as e:
         logger.warning(f"解析duration失败: {duration}, 错误: {e}，使用默认2y")
         return "2y"
 
 
-def _filter_by_duration(df: pd.DataFrame, duration: str) -> pd.DataFrame:
+@lru_cache(maxsize=32)
+def _duration_to_days(duration: str) -> int | None:
     """
-    根据duration参数截取对应周期的数据
+    将 duration 参数换算为交易日数量，无法识别时返回 None
     
     Args:
-        df: 完整的历史数据DataFrame
         duration: 数据周期，如 '1M', '3M', '1Y'
-    
-    Returns:
-        截取后的DataFrame
     """
-    if df is None or df.empty:
-        return df
-    
     try:
         duration = duration.strip().upper()
         if 'MO' in duration:
             months = int(duration.replace('MO', '').strip())
-            days = months * 22
+            return months * 22
         elif 'M' in duration:
             months = int(duration.replace('M', '').strip())
-            days = months * 22
+            return months * 22
         elif 'Y' in duration:
             years = int(duration.replace('Y', '').strip())
-            days = years * 252
+            return years * 252
         elif 'W' in duration:
             weeks = int(duration.replace('W', '').strip())
-            days = weeks * 5
+            return weeks * 5
         elif 'D' in duration:
-            days = int(duration.replace('D', '').strip())
-        else:
-            return df
-        
-        if len(df) > days:
-            return df.tail(days)
-        else:
-            return df
-    except Exception as e:
+            return int(duration.replace('D', '').strip())
+        return None
+    except (ValueError, AttributeError) as e:
         logger.warning(f"解析duration失败: {duration}, 错误: {e}，返回全部数据")
+        return None
+
+
+def _filter_by_duration(df: pd.DataFrame, duration: str) -> pd.DataFrame:
+    """
+    根据duration参数截取对应周期的数据
+    
+    Args:
+        df: 完整的历史数据DataFrame
+        duration: 数据周期，如 '1M', '3M', '1Y'
+    
+    Returns:
+        截取后的DataFrame
+    """
+    if df is None or df.empty:
+        return df
+    
+    days = _duration_to_days(duration)
+    if days is None or len(df) <= days:
         return df
+    # 不用 iloc[-days:]：days 为 0 时 -0 会取到整表
+    return df.iloc[len(df) - days:]
 
 
 def _format_historical_data(df: pd.DataFrame):
     """
     格式化历史数据
+    按列整体转换为 numpy 数组后再组装记录，避免 iterrows 逐行构造 Series
     """
-    result = []
-    has_volume = 'Volume' in df.columns
-    
-    for date, row in df.iterrows():
-        # 检查 OHLC 是否有效，如果无效则跳过
-        if pd.isna(row['Open']) or pd.isna(row['High']) or pd.isna(row['Low']) or pd.isna(row['Close']):
-            continue
-
-        date_str = date.strftime('%Y%m%d')
-        if pd.notna(date.hour):
-            date_str = date.strftime('%Y%m%d %H:%M:%S')
-        
-        volume = 0
-        if has_volume and pd.notna(row.get('Volume')):
-            try:
-                volume = int(row['Volume'])
-            except (ValueError, TypeError):
-                volume = 0
-        
-        result.append({
+    # 跳过 OHLC 任一无效的 K线
+    df = df[df[['Open', 'High', 'Low', 'Close']].notna().all(axis=1)]
+
+    # 整个索引判断一次粒度：日线及以上只保留日期，分钟线带时间
+    is_intraday = bool((df.index != df.index.normalize()).any())
+    dates = df.index.strftime('%Y%m%d %H:%M:%S' if is_intraday else '%Y%m%d').tolist()
+    opens = df['Open'].to_numpy(dtype=np.float64)
+    highs = df['High'].to_numpy(dtype=np.float64)
+    lows = df['Low'].to_numpy(dtype=np.float64)
+    closes = df['Close'].to_numpy(dtype=np.float64)
+    averages = (highs + lows + closes) / 3
+
+    if 'Volume' in df.columns:
+        volumes = np.nan_to_num(
+            df['Volume'].to_numpy(dtype=np.float64), nan=0.0, posinf=0.0, neginf=0.0
+        ).astype(np.int64)
+    else:
+        volumes = np.zeros(len(df), dtype=np.int64)
+
+    return [
+        {
             'date': date_str,
-            'open': float(row['Open']),
-            'high': float(row['High']),
-            'low': float(row['Low']),
-            'close': float(row['Close']),
+            'open': open_,
+            'high': high,
+            'low': low,
+            'close': close,
             'volume': volume,
-            'average': float((row['High'] + row['Low'] + row['Close']) / 3),
+            'average': average,
             'barCount': 1
-        })
-    
-    return result
+        }
+        for date_str, open_, high, low, close, volume, average in zip(
+            dates, opens.tolist(), highs.tolist(), lows.tolist(),
+            closes.tolist(), volumes.tolist(), averages.tolist()
+        )
+    ]
+
+
+def _fetch_historical_data(symbol: str, duration: str, yf_interval: str, cache_key: str):
+    """
+    [内部函数] 从 yfinance 获取历史数据并格式化，成功时写入缓存
+    """
+    period = _calculate_period_from_duration(duration)
+    ticker = _get_ticker(symbol)
+    df = _yf_call(ticker.history, period=period, interval=yf_interval)
+
+    if df.empty:
+        logger.warning(f"无法获取历史数据: {symbol}")
+        return None, {'code': 200, 'message': f'证券 {symbol} 不存在或没有数据'}
+
+    if 'Volume' not in df.columns:
+        logger.warning(f"警告: {symbol} 的数据中没有 Volume 列，成交量相关指标将无法计算")
+    elif df['Volume'].isna().all():
+        logger.warning(f"警告: {symbol} 的成交量数据全部为 NaN，成交量相关指标将无法计算")
+    elif df['Volume'].isna().any():
+        nan_count = df['Volume'].isna().sum()
+        logger.warning(f"警告: {symbol} 有 {nan_count} 条数据的成交量为 NaN，将使用 0 代替")
+
+    if df.index.tzinfo is not None:
+        df.index = df.index.tz_localize(None)
+
+    filtered_df = _filter_by_duration(df, duration)
+    logger.info(f"已获取历史数据: {symbol}, {len(filtered_df)} 条")
+    records = sanitize_data(_format_historical_data(filtered_df))
+    timeout = HISTORY_CACHE_TIMEOUT_DAILY if yf_interval in DAILY_INTERVALS else HISTORY_CACHE_TIMEOUT_INTRADAY
+    cache.set(cache_key, records, timeout=timeout)
+    return records, None
 
 
 def get_historical_data(symbol: str, duration: str = '1 D', 
                        bar_size: str = '5 mins', exchange: str = '', 
                        currency: str = 'USD'):
     """
-    获取历史数据（不使用本地缓存，直接调用 yfinance）
+    获取历史数据（调用 yfinance，格式化结果短时缓存）
     duration: 数据周期，如 '1 D', '1 W', '1 M', '3 M', '1 Y'
     bar_size: K线周期，如 '1 min', '5 mins', '1 hour', '1 day'
     """
     try:
-        interval_map = {
-            '1 min': '1m',
-            '2 mins': '2m',
-            '5 mins': '5m',
-            '15 mins': '15m',
-            '30 mins': '30m',
-            '1 hour': '1h',
-            '1 day': '1d',
-            '1 week': '1wk',
-            '1 month': '1mo'
-        }
-        
-        yf_interval = interval_map.get(bar_size, '1d')
-        period = _calculate_period_from_duration(duration)
-        ticker = yf.Ticker(symbol)
-        df = ticker.history(period=period, interval=yf_interval)
-
-        if df.empty:
-            logger.warning(f"无法获取历史数据: {symbol}")
-            return None, {'code': 200, 'message': f'证券 {symbol} 不存在或没有数据'}
-
-        if 'Volume' not in df.columns:
-            logger.warning(f"警告: {symbol} 的数据中没有 Volume 列，成交量相关指标将无法计算")
-        elif df['Volume'].isna().all():
-            logger.warning(f"警告: {symbol} 的成交量数据全部为 NaN，成交量相关指标将无法计算")
-        elif df['Volume'].isna().any():
-            nan_count = df['Volume'].isna().sum()
-            logger.warning(f"警告: {symbol} 有 {nan_count} 条数据的成交量为 NaN，将使用 0 代替")
-
-        if df.index.tzinfo is not None:
-            df.index = df.index.tz_localize(None)
-
-        filtered_df = _filter_by_duration(df, duration)
-        logger.info(f"已获取历史数据: {symbol}, {len(filtered_df)} 条")
-        return sanitize_data(_format_historical_data(filtered_df)), None
+        yf_interval = INTERVAL_MAP.get(bar_size, '1d')
+        cache_key = f"yf_history_{symbol}_{yf_interval}_{duration.replace(' ', '')}"
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached, None
+
+        # 缓存未命中时，同一进程内相同参数的并发请求只回源一次
+        return _coalesced(cache_key, _fetch_historical_data, symbol, duration, yf_interval, cache_key)
         
     except Exception as e:
         logger.error(f"获取历史数据失败: {symbol}, 错误: {e}")
@@ -567,17 +872,13 @@ def get_news(symbol: str) -> List[Dict[str, Any]]:
     获取股票新闻
     """
     try:
-        ticker = yf.Ticker(symbol)
-        news = ticker.news
+        ticker = _get_ticker(symbol)
+        news = _yf_call(lambda: ticker.news)
         results = []
         for item in news:
-            content = item.get('content', {})
             # 处理新旧两种格式
-            title = content.get('title') or item.get('title')
-            publisher = (content.get('provider') or {}).get('displayName') or item.get('publisher')
-            link = (content.get('clickThroughUrl') or {}).get('url') or item.get('link')
-            pub_time_str = content.get('pubDate') or item.get('providerPublishTime')
-            summary = content.get('summary') or content.get('description') or item.get('summary') or item.get('description', '')
+            fields = {field: _first_path(item, paths) for field, paths in NEWS_FIELD_PATHS.items()}
+            pub_time_str = fields['pub_time']
             
             # 格式化发布时间
             pub_time_fmt = ""
@@ -585,39 +886,33 @@ def get_news(symbol: str) -> List[Dict[str, Any]]:
                 try:
                     if isinstance(pub_time_str, (int, float)):
                         dt = datetime.fromtimestamp(pub_time_str)
-                        pub_time_fmt = dt.strftime('%Y-%m-%d')
                     else:
                         # 尝试解析 ISO 格式或其他格式
-                        from dateutil import parser
-                        dt = parser.parse(str(pub_time_str))
-                        pub_time_fmt = dt.strftime('%Y-%m-%d')
+                        dt = date_parser.parse(pub_time_str)
+                    pub_time_fmt = dt.strftime('%Y-%m-%d')
                 except Exception:
                     pub_time_fmt = str(pub_time_str)
             
             # 处理缩略图
             thumbnail = None
-            thumb_data = content.get('thumbnail') or item.get('thumbnail')
-            if thumb_data:
-                resolutions = (thumb_data or {}).get('resolutions', [])
-                if resolutions:
-                    thumbnail = (resolutions[0] or {}).get('url')
+            resolutions = _dig(fields['thumbnail'], ('resolutions',))
+            if resolutions:
+                thumbnail = _dig(resolutions[0], ('url',))
 
             results.append({
-                'uuid': item.get('id') or item.get('uuid'),
-                'title': title,
-                'publisher': publisher,
-                'link': link,
+                'uuid': fields['uuid'],
+                'title': fields['title'],
+                'publisher': fields['publisher'],
+                'link': fields['link'],
                 'provider_publish_time': pub_time_str,
                 'provider_publish_time_fmt': pub_time_fmt,
-                'type': content.get('contentType') or item.get('type'),
-                'summary': summary,
+                'type': fields['type'],
+                'summary': fields['summary'] or '',
                 'thumbnail': thumbnail,
                 'related_tickers': item.get('relatedTickers', []) # 暂时保持原样，如果新格式没有则为空
             })
         
-        # 打印 yfinance 新闻获取结果
-        print(f"--- yfinance fetched {len(results)} articles for {symbol} ---")
-            
+        logger.debug("yfinance 获取新闻 %d 条: %s", len(results), symbol)
         return sanitize_data(results)
     except Exception as e:
         logger.error(f"获取新闻失败: {symbol}, {e}")
@@ -641,12 +936,7 @@ def crawl_news_article(url: str) -> Dict[str, Any]:
         article.download()
         article.parse()
         
-        # 打印抓取到的新闻详情
-        print(f"\n{'-'*15} Crawled News Detail {'-'*15}")
-        print(f"URL: {url}")
-        print(f"Title: {article.title}")
-        print(f"Text Length: {len(article.text) if article.text else 0} chars")
-        print(f"{'-'*47}\n")
+        logger.debug("已抓取新闻详情: %s, 标题: %s, 正文长度: %d", url, article.title, len(article.text or ''))
         
         # 如果需要 NLP (摘要、关键词)，需要先下载 nltk 数据
         try:
@@ -669,13 +959,14 @@ def crawl_news_article(url: str) -> Dict[str, Any]:
         return {}
 
 
-def get_options_chain(symbol: str) -> Dict[str, Any]:
+def get_options_chain(symbol: str) -> Dict[str, Any] | None:
     """
     获取完整期权链数据
+    获取失败时返回 None（区别于没有期权的空结果，调用方不应缓存）
     """
     try:
-        ticker = yf.Ticker(symbol)
-        expirations = ticker.options
+        ticker = _get_ticker(symbol)
+        expirations = _yf_call(lambda: ticker.options)
         if not expirations:
             logger.info(f"{symbol} 没有期权到期日数据")
             return {'expirations': [], 'calls': [], 'puts': []}
@@ -683,56 +974,105 @@ def get_options_chain(symbol: str) -> Dict[str, Any]:
         # 默认获取最近一个到期日的数据
         latest_expiry = expirations[0]
         try:
-            opt = ticker.option_chain(latest_expiry)
+            opt = _yf_call(ticker.option_chain, latest_expiry)
         except Exception as e:
             logger.error(f"获取 {symbol} 到期日 {latest_expiry} 的期权链失败: {e}")
-            return {'expirations': list(expirations), 'calls': [], 'puts': []}
-        
-        calls = opt.calls.to_dict(orient='records') if not opt.calls.empty else []
-        puts = opt.puts.to_dict(orient='records') if not opt.puts.empty else []
+            return None
         
-        result = {
+        return {
             'expirations': list(expirations),
             'current_expiry': latest_expiry,
-            'calls': calls,
-            'puts': puts
+            'calls': _records_from_df(opt.calls),
+            'puts': _records_from_df(opt.puts),
         }
-        return sanitize_data(result)
     except Exception as e:
         logger.error(f"获取期权链总体失败: {symbol}, {e}")
-        return {'expirations': [], 'calls': [], 'puts': []}
+        return None
+
+
+def _records_from_df(df: pd.DataFrame | None) -> List[Dict[str, Any]]:
+    """
+    将 DataFrame 转为记录列表，按列 dtype 一次性转换而不是逐单元格判断类型
+    日期列格式化为 ISO 8601 字符串（带时区的列保留偏移，与 Timestamp.isoformat 一致），
+    浮点列 NaN/Inf 转为 None，其他列缺失值转为 None
+    """
+    if df is None or df.empty:
+        return []
+
+    columns = []
+    for name in df.columns:
+        col = df[name]
+        if pd.api.types.is_datetime64_any_dtype(col):
+            values = col.dt.strftime('%Y-%m-%dT%H:%M:%S%z')
+            if col.dt.tz is not None:
+                # %z 输出 +0000，转为 ISO 8601 扩展格式 +00:00
+                values = values.str.replace(r'([+-]\d{2})(\d{2})$', r'\1:\2', regex=True)
+            values = values.astype(object).where(col.notna(), None)
+        elif pd.api.types.is_float_dtype(col):
+            values = col.astype(object).where(np.isfinite(col.to_numpy(dtype=np.float64)), None)
+        elif pd.api.types.is_numeric_dtype(col):
+            values = col
+        else:
+            values = col.astype(object).where(col.notna(), None)
+        columns.append(values.tolist())
+
+    keys = [str(name) for name in df.columns]
+    return [dict(zip(keys, row)) for row in zip(*columns)]
 
 
-def get_holders(symbol: str) -> Dict[str, Any]:
+def get_holders(symbol: str) -> Dict[str, Any] | None:
     """
-    获取持股信息
+    获取持股信息，获取失败时返回 None
     """
     try:
-        ticker = yf.Ticker(symbol)
-        major = ticker.major_holders.to_dict() if ticker.major_holders is not None else {}
-        inst = ticker.institutional_holders.to_dict(orient='records') if ticker.institutional_holders is not None else []
-        return sanitize_data({
+        ticker = _get_ticker(symbol)
+        major_holders = _yf_call(lambda: ticker.major_holders)
+        major = sanitize_data(major_holders.to_dict()) if major_holders is not None else {}
+        return {
             'major_holders': major,
-            'institutional_holders': inst
-        })
+            'institutional_holders': _records_from_df(ticker.institutional_holders),
+        }
     except Exception as e:
         logger.error(f"获取持股信息失败: {symbol}, {e}")
+        return None
+
+
+def _format_financial_statement(df: pd.DataFrame | None) -> Dict[str, Dict[str, Any]]:
+    """
+    将财务报表转为 {日期: {科目: 数值}}
+    日期列整体格式化为 YYYY-MM-DD，NaN/Inf 整表替换为 None 后一次性 to_dict
+    """
+    if df is None or df.empty:
         return {}
 
+    if isinstance(df.columns, pd.DatetimeIndex):
+        df = df.set_axis(df.columns.strftime('%Y-%m-%d'), axis=1)
+    df = df.replace([np.inf, -np.inf], np.nan)
+    return df.astype(object).where(df.notna(), None).to_dict()
 
-def get_financials(symbol: str) -> Dict[str, Any]:
+
+def _fetch_financial_statement(ticker: yf.Ticker, name: str) -> Dict[str, Dict[str, Any]] | None:
+    """
+    [内部函数] 获取单张财务报表，失败时返回 None，不影响其他报表的获取
+    """
+    try:
+        return _format_financial_statement(_yf_call(getattr, ticker, name))
+    except Exception as e:
+        logger.warning(f"获取财务报表失败: {ticker.ticker} {name}, {e}")
+        return None
+
+
+def get_financials(symbol: str, statements: Tuple[str, ...] = FINANCIAL_STATEMENTS) -> Dict[str, Any] | None:
     """
     获取财务报表摘要
+    各报表是独立的 HTTP 请求，并发获取；只返回获取成功的报表，全部失败时返回 None
     """
     try:
-        ticker = yf.Ticker(symbol)
-        result = {
-            'income_stmt': ticker.income_stmt.to_dict() if ticker.income_stmt is not None else {},
-            'balance_sheet': ticker.balance_sheet.to_dict() if ticker.balance_sheet is not None else {},
-            'cashflow': ticker.cashflow.to_dict() if ticker.cashflow is not None else {},
-        }
-        return sanitize_data(result)
+        ticker = _get_ticker(symbol)
+        with ThreadPoolExecutor(max_workers=len(statements)) as executor:
+            results = zip(statements, executor.map(lambda name: _fetch_financial_statement(ticker, name), statements))
+            financials = {name: statement for name, statement in results if statement is not None}
+        return financials or None
     except Exception as e:
         logger.error(f"获取财务数据失败: {symbol}, {e}")
-        return {}
-
+        return None